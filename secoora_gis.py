@@ -0,0 +1,339 @@
+"""
+Parse the SECOORA assets spreadsheets into GeoJSON and shapefiles.
+
+"""
+
+import os
+import json
+
+import numpy as np
+import pandas as pd
+
+try:
+    import orjson
+
+    def _dumps(obj):
+        option = orjson.OPT_INDENT_2 | orjson.OPT_SORT_KEYS
+        return orjson.dumps(obj, option=option)
+except ImportError:
+    try:
+        import ujson
+
+        def _dumps(obj):
+            return ujson.dumps(obj, sort_keys=True, indent=2).encode("utf-8")
+    except ImportError:
+        def _dumps(obj):
+            kw = dict(sort_keys=True, indent=2, separators=(",", ": "))
+            return json.dumps(obj, **kw).encode("utf-8")
+
+
+url = ("https://raw.githubusercontent.com/ocefpaf/"
+       "secoora_assets_map/gh-pages/secoora_icons/")
+
+
+status_colors = dict(Planned="orange",
+                     Operational="green",
+                     Permitting="yellow",
+                     Construction="yellow")
+
+platforms_icons = dict({"Fixed Surface Buoy": "buoy",
+                        "Fixed Bottom Station": "circ",
+                        "Fixed Bottom Mount Mooring": "tri",
+                        "Fixed Coastal Station": "shore_station",
+                        "HFRadar": "hfradar"})
+
+icon = (url + "{platform}-{status}.png").format
+_icon_cache = {}
+
+
+def _icon(platform, status, _cache=_icon_cache):
+    """Memoized `icon`, there are only a handful of platform+status URLs."""
+    key = platform, status
+    value = _cache.get(key)
+    if value is None:
+        value = _cache[key] = icon(platform=platform, status=status)
+    return value
+
+
+# The values are from a GMT script @vembus provided.
+# The comments values were used by @kwilcox in
+# https://github.com/SECOORA/static_assets/blob/master/hfradar/hfradar_csv_to_gis.py
+ranges = dict({5: 190,  # 225
+               8: 160,  # 175
+               12: 130,  # 124
+               16: 100})  # 100
+
+
+def _point(lon, lat, properties):
+    """Return a GeoJSON Point Feature."""
+    return {"type": "Feature",
+            "geometry": {"type": "Point", "coordinates": [lon, lat]},
+            "properties": properties}
+
+
+def _polygon(ring, properties):
+    """Return a GeoJSON Polygon Feature with a single `ring`."""
+    return {"type": "Feature",
+            "geometry": {"type": "Polygon", "coordinates": [ring]},
+            "properties": properties}
+
+
+def _feature_collection(features):
+    """Return a GeoJSON FeatureCollection of `features`."""
+    return {"type": "FeatureCollection", "features": features}
+
+
+def arc_rings(lon, lat, r_deg, theta1, theta2, n=40):
+    """
+    Make closed HF-radar wedge rings from arrays of StartAngle (`theta1`),
+    SpreadAngle (`theta2`), Center (`lon`, `lat`), and Radius (`r_deg`).
+
+    All the rings are computed at once and returned as a list of
+    `[[lon, lat], ...]` lists.
+
+    """
+    lon, lat, r_deg, theta1, theta2 = [np.asarray(v, dtype=float) for v in
+                                       (lon, lat, r_deg, theta1, theta2)]
+    steps = np.linspace(1, 0, n)[None, :]
+    ang = np.deg2rad(theta1[:, None] + theta2[:, None] * steps)
+    xs = lon[:, None] + r_deg[:, None] * np.cos(ang)
+    ys = lat[:, None] + r_deg[:, None] * np.sin(ang)
+    # Start and end the rings at the radar site.
+    xs = np.column_stack([lon, xs, lon])
+    ys = np.column_stack([lat, ys, lat])
+    return np.stack([xs, ys], axis=-1).tolist()
+
+
+def sort_groups(df, keys):
+    """
+    Return `df` in the same row order a `groupby(keys)` iteration would give.
+
+    Like the groupby, rows with a missing key are dropped.
+
+    """
+    return df.dropna(subset=keys).sort_values(keys, kind="mergesort")
+
+
+def has_angles(df):
+    """Mask the HF-radar sites in `df` with both StartAngle and SpreadAngle."""
+    theta1 = np.asarray(df["StartAngle"], dtype=float)
+    theta2 = np.asarray(df["SpreadAngle"], dtype=float)
+    return np.isfinite(theta1) & np.isfinite(theta2)
+
+
+def hfradar_rings(df):
+    """Return the `arc_rings` for every HF-radar site in `df`."""
+    r = [ranges[int(mhz)] / 111.1 for mhz in df["MHz"]]  # deg2km
+    return arc_rings(df["Longitude"], df["Latitude"], r,
+                     df["StartAngle"], df["SpreadAngle"])
+
+
+def iter_hfradar(df, **kw):
+    """
+    Yield the HF-radar site (Point) Features followed by the coverage
+    (Polygon) Features in the `df` row order, see `sort_groups`.
+
+    Expect a pandas.DataFrame with the following columns:
+    - ResponsibleParty
+    - Type
+    - DisplayTitle
+    - Abrreviated ID
+    - Latitude
+    - Longitude
+    - MHz Status
+    - StartAngle
+    - SpreadAngle
+
+    """
+    defaults = dict(stroke="#aeccae",
+                    stroke_width=1,
+                    stroke_opacity=0.5,
+                    fill="#deffde",
+                    fill_opacity=0.25)
+    defaults.update(kw)
+
+    columns = ["Status", "DisplayTitle", "MHz", "Longitude", "Latitude"]
+    rows = df[columns].itertuples(index=True, name=None)
+    for name, status, title, mhz, lon, lat in rows:
+        popupContent = "{} ({} MHz)".format(title, mhz)
+        properties = dict(icon=_icon("hfradar", status_colors[status]),
+                          name=name,
+                          popupContent=popupContent)
+        yield _point(lon, lat, properties)
+
+    # Sites without StartAngle/SpreadAngle get only a Point.
+    for ring in hfradar_rings(df[has_angles(df)]):
+        yield _polygon(ring, defaults)
+
+
+def parse_hfradar(df, **kw):
+    """Return the `iter_hfradar` Features grouped by Status."""
+    df = sort_groups(df, ["Status"])
+    return _feature_collection(list(iter_hfradar(df, **kw)))
+
+
+def iter_stations(df):
+    """
+    Yield SECOORA stations Features in the `df` row order, use
+    `sort_groups` to group them into PlatformType+Status.
+
+    Expect a pandas.DataFrame with the following columns:
+    - PlatformType
+    - Status
+    - Longitude
+    - Latitude
+    - LocationDescription
+    - DisplayTitle (name)
+
+    """
+    columns = ["PlatformType", "Status", "Name", "LocationDescription",
+               "Longitude", "Latitude"]
+    rows = df[columns].itertuples(index=False, name=None)
+    for platformtype, status, name, description, lon, lat in rows:
+        properties = dict(icon=_icon(platforms_icons[platformtype],
+                                     status_colors[status]),
+                          name=name,
+                          popupContent=description)
+        yield _point(lon, lat, properties)
+
+
+def parse_stations(df):
+    """Return the `iter_stations` Features grouped by PlatformType+Status."""
+    df = sort_groups(df, ["PlatformType", "Status"])
+    return _feature_collection(list(iter_stations(df)))
+
+
+def save_geojson(geojson, fname):
+    """Save to GeoJSON."""
+    with open(fname, "wb") as f:
+        f.write(_dumps(geojson))
+
+
+def save_geojson_stream(features, fname):
+    """
+    Save an iterable of `features` to GeoJSON writing one Feature at a time,
+    without building the `FeatureCollection` in memory.
+
+    The layout matches `save_geojson` and `fname` is only replaced once all
+    the features were written.
+
+    """
+    tmp = fname + ".tmp"
+    try:
+        with open(tmp, "wb") as f:
+            f.write(b'{\n  "features": [')
+            sep = b"\n    "
+            for feature in features:
+                f.write(sep)
+                f.write(_dumps(feature).replace(b"\n", b"\n    "))
+                sep = b",\n    "
+            if sep != b"\n    ":
+                f.write(b"\n  ")
+            f.write(b'],\n  "type": "FeatureCollection"\n}')
+        os.replace(tmp, fname)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def _write_records(records, fname, geometry):
+    """Save the Fiona `records` of one `geometry` type as a shapefile."""
+    import fiona
+
+    schema = {"geometry": geometry,
+              "properties": {"name": "str:80"}}
+
+    with fiona.open(fname, "w", "ESRI Shapefile", schema) as f:
+        f.writerecords(records)
+
+
+def _write_shapefile(features, fname, geometry):
+    """Save `(position, feature)` pairs keeping only the name property."""
+    records = ({"geometry": feature["geometry"],
+                "properties": {"name": feature["properties"].get("name", k)}}
+               for k, feature in features)
+    _write_records(records, fname, geometry)
+
+
+def write_points_shp(df, fname, name_col="Name", lon_col="Longitude",
+                     lat_col="Latitude"):
+    """
+    Save the `df` rows as a Point shapefile straight from the DataFrame.
+
+    The `name_col` column is passed along as the name property, use `None`
+    to pass the index instead.
+
+    """
+    if name_col is None:
+        rows = df[[lon_col, lat_col]].itertuples(index=True, name=None)
+    else:
+        rows = df[[name_col, lon_col, lat_col]].itertuples(index=False,
+                                                           name=None)
+    records = ({"geometry": {"type": "Point", "coordinates": [lon, lat]},
+                "properties": {"name": name}}
+               for name, lon, lat in rows)
+    _write_records(records, fname, "Point")
+
+
+def write_hfradar_polygons_shp(df, fname):
+    """
+    Save the HF-radar coverage wedges as a Polygon shapefile straight from
+    the DataFrame, using the site ID (index) as the name property.
+
+    Sites without StartAngle/SpreadAngle are skipped.
+
+    """
+    df = df[has_angles(df)]
+    records = ({"geometry": {"type": "Polygon", "coordinates": [ring]},
+                "properties": {"name": name}}
+               for name, ring in zip(df.index, hfradar_rings(df)))
+    _write_records(records, fname, "Polygon")
+
+
+def save_shapefile(geojson, fname, geometry="Point"):
+    """
+    Save one `geometry` type from a geojson of a __geo_interface__ as a
+    shapefile`.
+
+    CAVEAT: this is a lossy conversion! I am passing along only the name
+    property.
+
+    Kept for compatibility, prefer `write_points_shp` and
+    `write_hfradar_polygons_shp` that skip the GeoJSON round-trip.
+
+    """
+    features = ((k, feature) for k, feature in enumerate(geojson["features"])
+                if feature["geometry"]["type"] == geometry)
+    _write_shapefile(features, fname, geometry)
+
+
+def read_spreadsheet(fname, index_col):
+    """
+    Read the `fname` spreadsheet caching it as Parquet next to it.
+
+    The cache is keyed by `index_col` and re-used while it is newer than the
+    spreadsheet. It is only an optimization, any failure to read or write it
+    falls back to the spreadsheet.
+
+    """
+    cache = "{}_{}.parquet".format(os.path.splitext(fname)[0], index_col)
+    if (os.path.exists(cache) and
+            os.path.getmtime(cache) >= os.path.getmtime(fname)):
+        try:
+            return pd.read_parquet(cache)
+        except Exception:
+            pass  # Corrupted cache, it is re-written below.
+
+    # The openpyxl reader loads the workbook read-only and values-only.
+    df = pd.read_excel(fname, index_col=index_col, engine="openpyxl")
+    tmp = cache + ".tmp"
+    try:
+        df.to_parquet(tmp)
+        os.replace(tmp, cache)
+    except Exception:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+    return df